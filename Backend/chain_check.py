@@ -0,0 +1,150 @@
+"""
+The Block type and the checks behind Blockchain.valid_chain, in typed Python so mypyc can compile them.
+Build: pip install mypy, then python setup.py build_ext --inplace
+The build is named _chain_check, so it never shadows this file. simple_blockchain.py uses it only
+while it was built from this exact source, and falls back to this file (with a warning) after an edit.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+PairHasher = Optional[Callable[[bytes], bytes]]  # pow_shani.sha256_many when built
+
+
+def serialize(obj: Any) -> bytes:
+    """
+    Canonical JSON bytes (sorted keys, compact) used for hashing.
+    Always orjson: the json module writes floats differently (1e-07 vs 1e-7), which would change hashes.
+    """
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+
+@dataclass(slots=True, frozen=True)
+class Block:
+    """
+    A forged block. Frozen, so its header hash is computed once, at creation.
+    """
+    index: int
+    timestamp: float
+    transactions: Tuple[Any, ...]
+    proof: int
+    previous_hash: str
+    merkle_root: str = ''
+    block_hash: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Transactions are covered by merkle_root; the header is a fixed-order tuple, no key sorting
+        header = (self.index, self.timestamp, self.merkle_root, self.proof, self.previous_hash)
+        object.__setattr__(self, 'block_hash', hashlib.sha256(serialize(header)).hexdigest())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Block':
+        """
+        Builds a block from API data, raising KeyError or TypeError for a missing or mistyped field.
+        The checks are explicit so compiled and plain-Python nodes reject the same peer blocks.
+        """
+        index, timestamp, proof = data['index'], data['timestamp'], data['proof']
+        transactions, previous_hash, merkle_root = data['transactions'], data['previous_hash'], data['merkle_root']
+        if type(index) is not int or type(proof) is not int or type(timestamp) not in (int, float):
+            raise TypeError("index and proof must be integers, timestamp a number")
+        if type(previous_hash) is not str or type(merkle_root) is not str or type(transactions) not in (list, tuple):
+            raise TypeError("hashes must be strings, transactions a list")
+        return cls(
+            index=index,
+            timestamp=float(timestamp),
+            transactions=tuple(transactions),
+            proof=proof,
+            previous_hash=previous_hash,
+            merkle_root=merkle_root,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The block as served by the API.
+        """
+        return {
+            'index': self.index,
+            'timestamp': self.timestamp,
+            'transactions': self.transactions,
+            'merkle_root': self.merkle_root,
+            'proof': self.proof,
+            'previous_hash': self.previous_hash,
+        }
+
+
+def valid_proof(last_proof: int, proof: int, last_hash: str, target: int) -> bool:
+    """
+    Is sha256(last_proof, proof, last_hash), read as a big-endian integer, below target?
+    """
+    guess = f'{last_proof}{proof}{last_hash}'.encode()
+    return int.from_bytes(hashlib.sha256(guess).digest(), 'big') < target
+
+
+def merkle_root(tx_hashes: List[bytes], sha256_many: PairHasher) -> str:
+    """
+    Computes the Merkle root of a list of transaction hashes (hex).
+    Odd levels duplicate their last hash, as in Bitcoin.
+    """
+    if not tx_hashes:
+        return hashlib.sha256(b'').hexdigest()
+    if sha256_many is not None:
+        # Keep each level as one buffer and hash all its pairs in a single C call
+        buf = b''.join(tx_hashes)
+        while len(buf) > 32:
+            if len(buf) % 64:
+                buf += buf[-32:]
+            buf = sha256_many(buf)
+        return buf.hex()
+    level = tx_hashes
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def valid_merkle_root(block: Block, sha256_many: PairHasher) -> bool:
+    """
+    Checks that a block's merkle_root matches its transactions.
+    """
+    tx_hashes = [hashlib.sha256(serialize(tx)).digest() for tx in block.transactions]
+    return block.merkle_root == merkle_root(tx_hashes, sha256_many)
+
+
+def valid_chain(chain: Iterable[Block], target: int, sha256_many: PairHasher) -> bool:
+    """
+    Determine if a given blockchain is valid:
+    - hashes link up
+    - proofs are valid according to PoW rules
+    Blocks are consumed in order, so a streamed chain stops downloading at the first bad block.
+    """
+    blocks = iter(chain)
+    last_block = next(blocks, None)
+    if last_block is None:
+        return False
+
+    if not valid_merkle_root(last_block, sha256_many):
+        return False
+
+    for block in blocks:
+        # A block's hash is both the link and the PoW input for the next block
+        last_hash = last_block.block_hash
+
+        # Check that the hash of the block is correct
+        if block.previous_hash != last_hash:
+            return False
+
+        # Check that the proof is valid (mined against last_hash, see /mine)
+        if not valid_proof(last_block.proof, block.proof, last_hash, target):
+            return False
+
+        # Check that the transactions match the hashed merkle root; hashes every transaction, so last
+        if not valid_merkle_root(block, sha256_many):
+            return False
+
+        last_block = block
+
+    return True
@@ -0,0 +1,263 @@
+/*
+ * pow_avx2: 8-way AVX2 nonce search for Blockchain.proof_of_work.
+ *
+ * Same contract as pow_shani.search, for CPUs without the SHA extensions:
+ * eight consecutive nonces are hashed at once, one per 32-bit lane of a YMM
+ * register, following the 8-way transform in Bitcoin Core's sha256_avx2.cpp.
+ * Nonces are only batched while they share a decimal width, so all eight
+ * messages have the same length and the same, precomputed padding; nothing is
+ * zero-padded, which keeps proofs identical to Blockchain.valid_proof.
+ *
+ * Build: python setup.py build_ext --inplace
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include "pow_sha256.h"
+
+#if defined(__x86_64__) || defined(__i386__)
+#include <immintrin.h>
+#define POW_X86 1
+#endif
+
+#define LANES 8
+
+#ifdef POW_X86
+#define VROTR(x, n) _mm256_or_si256(_mm256_srli_epi32((x), (n)), _mm256_slli_epi32((x), 32 - (n)))
+
+static uint32_t
+read_be32(const unsigned char *p)
+{
+    return ((uint32_t)p[0] << 24) | ((uint32_t)p[1] << 16) | ((uint32_t)p[2] << 8) | (uint32_t)p[3];
+}
+
+__attribute__((target("avx2")))
+static __m256i
+load_lanes(unsigned char *const lanes[LANES], size_t offset)
+{
+    return _mm256_set_epi32(
+        (int)read_be32(lanes[7] + offset), (int)read_be32(lanes[6] + offset),
+        (int)read_be32(lanes[5] + offset), (int)read_be32(lanes[4] + offset),
+        (int)read_be32(lanes[3] + offset), (int)read_be32(lanes[2] + offset),
+        (int)read_be32(lanes[1] + offset), (int)read_be32(lanes[0] + offset));
+}
+
+/*
+ * Compresses `blocks` blocks starting at `offset` in every lane, starting
+ * from the shared midstate. out[i][lane] receives state word i of each lane.
+ */
+__attribute__((target("avx2")))
+static void
+transform_8way(uint32_t out[8][LANES], const uint32_t mid[8], unsigned char *const lanes[LANES],
+               size_t offset, size_t blocks)
+{
+    __m256i s[8], w[16];
+    size_t blk;
+    int i, t;
+
+    for (i = 0; i < 8; i++)
+        s[i] = _mm256_set1_epi32((int)mid[i]);
+
+    for (blk = 0; blk < blocks; blk++) {
+        __m256i a = s[0], b = s[1], c = s[2], d = s[3];
+        __m256i e = s[4], f = s[5], g = s[6], h = s[7];
+
+        for (t = 0; t < 64; t++) {
+            __m256i t1, t2;
+            if (t < 16) {
+                w[t] = load_lanes(lanes, offset + 64 * blk + 4 * (size_t)t);
+            } else {
+                __m256i w15 = w[(t - 15) & 15], w2 = w[(t - 2) & 15];
+                __m256i s0 = _mm256_xor_si256(_mm256_xor_si256(VROTR(w15, 7), VROTR(w15, 18)),
+                                              _mm256_srli_epi32(w15, 3));
+                __m256i s1 = _mm256_xor_si256(_mm256_xor_si256(VROTR(w2, 17), VROTR(w2, 19)),
+                                              _mm256_srli_epi32(w2, 10));
+                w[t & 15] = _mm256_add_epi32(_mm256_add_epi32(w[t & 15], s0),
+                                             _mm256_add_epi32(w[(t - 7) & 15], s1));
+            }
+            t1 = _mm256_add_epi32(h, _mm256_xor_si256(_mm256_xor_si256(VROTR(e, 6), VROTR(e, 11)), VROTR(e, 25)));
+            t1 = _mm256_add_epi32(t1, _mm256_xor_si256(_mm256_and_si256(e, f), _mm256_andnot_si256(e, g)));
+            t1 = _mm256_add_epi32(t1, _mm256_add_epi32(_mm256_set1_epi32((int)K[t]), w[t & 15]));
+            t2 = _mm256_xor_si256(_mm256_xor_si256(VROTR(a, 2), VROTR(a, 13)), VROTR(a, 22));
+            t2 = _mm256_add_epi32(t2, _mm256_or_si256(_mm256_and_si256(a, b),
+                                                      _mm256_and_si256(c, _mm256_or_si256(a, b))));
+            h = g; g = f; f = e; e = _mm256_add_epi32(d, t1);
+            d = c; c = b; b = a; a = _mm256_add_epi32(t1, t2);
+        }
+
+        s[0] = _mm256_add_epi32(s[0], a); s[1] = _mm256_add_epi32(s[1], b);
+        s[2] = _mm256_add_epi32(s[2], c); s[3] = _mm256_add_epi32(s[3], d);
+        s[4] = _mm256_add_epi32(s[4], e); s[5] = _mm256_add_epi32(s[5], f);
+        s[6] = _mm256_add_epi32(s[6], g); s[7] = _mm256_add_epi32(s[7], h);
+    }
+
+    for (i = 0; i < 8; i++)
+        _mm256_storeu_si256((__m256i *)out[i], s[i]);
+}
+
+/* Writes `nonce` as exactly `ndigits` ASCII digits. */
+static void
+write_digits(unsigned char *out, unsigned long long nonce, int ndigits)
+{
+    while (ndigits--) {
+        out[ndigits] = (unsigned char)('0' + nonce % 10);
+        nonce /= 10;
+    }
+}
+
+/* Same contract as search_nonce, eight nonces per compression. */
+static int
+search_nonce_8way(const unsigned char *prefix, size_t plen, const unsigned char *suffix, size_t slen,
+                  unsigned long long nonce, unsigned long long last, unsigned bits,
+                  unsigned long long *found)
+{
+    const size_t stride = plen + NONCE_DIGITS_MAX + slen + 128;
+    unsigned char *buf = malloc(LANES * stride);
+    unsigned char *lanes[LANES];
+    int j;
+
+    if (buf == NULL)
+        return -1;
+    for (j = 0; j < LANES; j++)
+        lanes[j] = buf + j * stride;
+
+    for (;;) {
+        uint32_t mid[8], out[8][LANES];
+        unsigned long long limit;
+        size_t blocks, skip;
+        int ndigits;
+
+        blocks = build_message(lanes[0], prefix, plen, suffix, slen, nonce, &ndigits);
+        limit = width_limit(ndigits);
+        for (j = 1; j < LANES; j++)
+            memcpy(lanes[j], lanes[0], blocks * 64);
+        skip = plen / 64;
+        memcpy(mid, IV, sizeof(mid));
+        if (skip)
+            transform_scalar(mid, lanes[0], skip);
+
+        for (;;) {
+            /* Wraps to the right count when limit is 0 (no wider nonce). */
+            unsigned long long remaining = limit - nonce;
+            unsigned long long to_last = last - nonce;
+            int n = remaining < LANES ? (int)remaining : LANES;
+
+            if (to_last < (unsigned long long)n)
+                n = (int)to_last + 1;
+
+            /* Spare lanes past the width boundary repeat lane 0 and are ignored. */
+            for (j = 0; j < LANES; j++)
+                write_digits(lanes[j] + plen, j < n ? nonce + (unsigned long long)j : nonce, ndigits);
+
+            transform_8way(out, mid, lanes, skip * 64, blocks - skip);
+
+            for (j = 0; j < n; j++) {
+                uint32_t st[8];
+                int i;
+                for (i = 0; i < 8; i++)
+                    st[i] = out[i][j];
+                if (leading_zero_bits(st, bits)) {
+                    free(buf);
+                    *found = nonce + (unsigned long long)j;
+                    return 0;
+                }
+            }
+
+            if (to_last < (unsigned long long)n) {
+                free(buf);
+                return 1;
+            }
+            if (remaining <= LANES) {
+                nonce = limit;
+                break;
+            }
+            nonce += LANES;
+        }
+    }
+}
+#endif
+
+static int have_avx2;
+
+PyDoc_STRVAR(mine_doc,
+"mine(prefix, suffix, start, bits, count=0) -> int | None\n\n"
+"Return the first nonce >= start such that sha256(prefix + str(nonce) + suffix)\n"
+"starts with `bits` zero bits, hashing eight nonces per step.\n"
+"With count > 0 only nonces below start + count are tried, and None is returned\n"
+"when none of them is valid. Runs without holding the GIL.");
+
+static PyObject *
+pow_mine(PyObject *self, PyObject *args)
+{
+    const unsigned char *prefix, *suffix;
+    Py_ssize_t plen, slen;
+    PyObject *start_obj, *count_obj = NULL;
+    unsigned long long start, count = 0, last, found = 0;
+    int bits, rc;
+
+    /* Not "K", which wraps out-of-range ints silently: negative or >= 2**64 raises OverflowError */
+    if (!PyArg_ParseTuple(args, "y#y#Oi|O:mine", &prefix, &plen, &suffix, &slen, &start_obj, &bits, &count_obj))
+        return NULL;
+    start = PyLong_AsUnsignedLongLong(start_obj);
+    if (start == (unsigned long long)-1 && PyErr_Occurred())
+        return NULL;
+    if (count_obj != NULL) {
+        count = PyLong_AsUnsignedLongLong(count_obj);
+        if (count == (unsigned long long)-1 && PyErr_Occurred())
+            return NULL;
+    }
+    if (bits < 0 || bits > 256) {
+        PyErr_SetString(PyExc_ValueError, "bits must be between 0 and 256");
+        return NULL;
+    }
+
+    last = search_last(start, count);
+
+    Py_BEGIN_ALLOW_THREADS
+#ifdef POW_X86
+    if (have_avx2)
+        rc = search_nonce_8way(prefix, (size_t)plen, suffix, (size_t)slen, start, last,
+                               (unsigned)bits, &found);
+    else
+#endif
+        rc = search_nonce(transform_scalar, prefix, (size_t)plen, suffix, (size_t)slen, start, last,
+                          (unsigned)bits, &found);
+    Py_END_ALLOW_THREADS
+
+    if (rc == -1)
+        return PyErr_NoMemory();
+    if (rc == 1) {
+        if (count)
+            Py_RETURN_NONE;
+        PyErr_SetString(PyExc_OverflowError, "no proof below 2**64");
+        return NULL;
+    }
+    return PyLong_FromUnsignedLongLong(found);
+}
+
+static PyMethodDef pow_methods[] = {
+    {"mine", pow_mine, METH_VARARGS, mine_doc},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef pow_module = {
+    PyModuleDef_HEAD_INIT, "pow_avx2", "8-way AVX2 SHA-256 nonce search for proof of work.", -1, pow_methods,
+};
+
+PyMODINIT_FUNC
+PyInit_pow_avx2(void)
+{
+    PyObject *m = PyModule_Create(&pow_module);
+
+    if (m == NULL)
+        return NULL;
+#ifdef POW_X86
+    __builtin_cpu_init();
+    have_avx2 = __builtin_cpu_supports("avx2") != 0;
+#endif
+    if (PyModule_AddIntConstant(m, "HAVE_AVX2", have_avx2) < 0) {
+        Py_DECREF(m);
+        return NULL;
+    }
+    return m;
+}
@@ -0,0 +1,148 @@
+"""
+Numba-compiled nonce search, for nodes that cannot build the C extensions.
+Run: pip install numba
+Same contract as pow_shani.search: first nonce >= start such that
+sha256(prefix + str(nonce) + suffix) starts with `bits` zero bits.
+"""
+
+import numpy as np
+from numba import get_num_threads, njit, prange
+
+CHUNK = 4096  # nonces per compiled call; prange splits each chunk into disjoint ranges per core
+
+K = np.array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+], dtype=np.int64)
+
+IV = np.array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+], dtype=np.int64)
+
+MASK = 0xFFFFFFFF
+TEN = np.uint64(10)  # nonces are uint64 so they reach 2**64 - 1; an int64 literal would promote them to float
+
+
+@njit(inline='always', cache=True)
+def _rotr(x, n):
+    return ((x >> n) | (x << (32 - n))) & MASK
+
+
+@njit(cache=True)
+def _compress(state, msg, offset, w):
+    """
+    One SHA-256 block of msg at offset. Words are held in int64 and masked to 32 bits.
+    """
+    for i in range(16):
+        j = offset + 4 * i
+        w[i] = (np.int64(msg[j]) << 24) | (np.int64(msg[j + 1]) << 16) | (np.int64(msg[j + 2]) << 8) | np.int64(msg[j + 3])
+    for i in range(16, 64):
+        s0 = _rotr(w[i - 15], 7) ^ _rotr(w[i - 15], 18) ^ (w[i - 15] >> 3)
+        s1 = _rotr(w[i - 2], 17) ^ _rotr(w[i - 2], 19) ^ (w[i - 2] >> 10)
+        w[i] = (w[i - 16] + s0 + w[i - 7] + s1) & MASK
+
+    a, b, c, d, e, f, g, h = state[0], state[1], state[2], state[3], state[4], state[5], state[6], state[7]
+    for i in range(64):
+        t1 = (h + (_rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)) + ((e & f) ^ (~e & g & MASK)) + K[i] + w[i]) & MASK
+        t2 = ((_rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)) + ((a & b) ^ (a & c) ^ (b & c))) & MASK
+        h, g, f, e = g, f, e, (d + t1) & MASK
+        d, c, b, a = c, b, a, (t1 + t2) & MASK
+
+    state[0] = (state[0] + a) & MASK
+    state[1] = (state[1] + b) & MASK
+    state[2] = (state[2] + c) & MASK
+    state[3] = (state[3] + d) & MASK
+    state[4] = (state[4] + e) & MASK
+    state[5] = (state[5] + f) & MASK
+    state[6] = (state[6] + g) & MASK
+    state[7] = (state[7] + h) & MASK
+
+
+@njit(cache=True)
+def _leading_zero_bits(state, bits):
+    i = 0
+    while bits >= 32:
+        if state[i] != 0:
+            return False
+        i += 1
+        bits -= 32
+    return bits == 0 or (state[i] >> (32 - bits)) == 0
+
+
+@njit(cache=True)
+def _build_message(msg, prefix, suffix, nonce):
+    """
+    Writes prefix + str(nonce) + suffix and its SHA-256 padding into msg; returns the block count.
+    """
+    plen, slen = prefix.size, suffix.size
+    digits = 1
+    rest = nonce // TEN
+    while rest:
+        digits += 1
+        rest //= TEN
+
+    length = plen + digits + slen
+    blocks = (length + 8) // 64 + 1
+    msg[:plen] = prefix
+    rest = nonce
+    for j in range(digits - 1, -1, -1):
+        msg[plen + j] = 48 + rest % TEN
+        rest //= TEN
+    msg[plen + digits:length] = suffix
+    msg[length] = 0x80
+    msg[length + 1:blocks * 64] = 0
+    bitlen = length * 8
+    for j in range(8):
+        msg[blocks * 64 - 1 - j] = (bitlen >> (8 * j)) & 0xFF
+    return blocks
+
+
+@njit(parallel=True, cache=True)
+def _search_chunk(prefix, suffix, start, bits, hits, parts):
+    """
+    Sets hits[i] when nonce start + i is a valid proof.
+    The chunk is split into `parts` disjoint ranges, one per thread, so no nonce is hashed twice.
+    """
+    n = hits.size
+    msg_size = ((prefix.size + 20 + suffix.size + 8) // 64 + 1) * 64
+    for part in prange(parts):
+        msg = np.empty(msg_size, dtype=np.uint8)
+        state = np.empty(8, dtype=np.int64)
+        w = np.empty(64, dtype=np.int64)
+        for i in range(part * n // parts, (part + 1) * n // parts):
+            blocks = _build_message(msg, prefix, suffix, start + np.uint64(i))
+            state[:] = IV
+            for blk in range(blocks):
+                _compress(state, msg, blk * 64, w)
+            hits[i] = _leading_zero_bits(state, bits)
+
+
+def search(prefix: bytes, suffix: bytes, start: int, bits: int, count: int = 0):
+    """
+    Searches CHUNK nonces at a time until one is valid; returns the first.
+    With count > 0 only nonces below start + count are tried, returning None if none is valid.
+    Like pow_shani.search, nonces stop at 2**64 - 1.
+    """
+    if not 0 <= bits <= 256:
+        raise ValueError("bits must be between 0 and 256")
+    if not 0 <= start < 2**64 or not 0 <= count < 2**64:
+        raise OverflowError("start and count must be between 0 and 2**64 - 1")
+    prefix_arr = np.frombuffer(prefix, dtype=np.uint8)
+    suffix_arr = np.frombuffer(suffix, dtype=np.uint8)
+    end = min(start + count, 2**64) if count else 2**64
+    hits = np.zeros(CHUNK, dtype=np.bool_)
+    while start < end:
+        batch = hits[:min(CHUNK, end - start)]
+        _search_chunk(prefix_arr, suffix_arr, np.uint64(start), bits, batch, get_num_threads())
+        if batch.any():
+            return start + int(batch.argmax())
+        start += batch.size
+    if count:
+        return None
+    raise OverflowError("no proof below 2**64")
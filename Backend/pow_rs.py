@@ -0,0 +1,43 @@
+"""
+Rust nonce search (the crate in pow_rs_package/), loaded through ctypes.
+Build: cargo build --release --manifest-path pow_rs_package/Cargo.toml
+Same contract as pow_shani.search: first nonce >= start such that
+sha256(prefix + str(nonce) + suffix) starts with `bits` zero bits.
+ctypes releases the GIL for the call, so concurrent /mine requests share the cores.
+"""
+
+import ctypes
+import os
+import sys
+
+LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pow_rs_package', 'target', 'release',
+                       {'darwin': 'libpow_rs.dylib', 'win32': 'pow_rs.dll'}.get(sys.platform, 'libpow_rs.so'))
+
+try:
+    _lib = ctypes.CDLL(LIBRARY)
+except OSError as exc:
+    raise ImportError(f"pow_rs is not built: {exc}") from exc
+
+_search = _lib.pow_rs_search
+_search.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.c_char_p, ctypes.c_size_t,
+                    ctypes.c_uint64, ctypes.c_uint64, ctypes.c_uint32, ctypes.POINTER(ctypes.c_uint64)]
+_search.restype = ctypes.c_bool
+
+
+def mine(prefix: bytes, suffix: bytes, start: int, bits: int, count: int = 0):
+    """
+    Returns the first valid nonce >= start.
+    With count > 0 only nonces below start + count are tried, returning None if none is valid.
+    ctypes would silently truncate out-of-range integers, so they are rejected here.
+    """
+    if not 0 <= bits <= 256:
+        raise ValueError("bits must be between 0 and 256")
+    if not 0 <= start < 2**64 or not 0 <= count < 2**64:
+        raise OverflowError("start and count must be between 0 and 2**64 - 1")
+    last = min(start + count, 2**64) - 1 if count else 2**64 - 1
+    nonce = ctypes.c_uint64()
+    if _search(prefix, len(prefix), suffix, len(suffix), start, last, bits, ctypes.byref(nonce)):
+        return nonce.value
+    if count:
+        return None
+    raise OverflowError("no proof below 2**64")
@@ -0,0 +1,68 @@
+//! pow_rs: native nonce search for Blockchain.proof_of_work.
+//!
+//! Finds the first nonce in start..=last such that
+//! sha256(prefix + str(nonce) + suffix) starts with `bits` zero bits.
+//! The prefix is absorbed once and the hasher state cloned per nonce;
+//! the `sha2` crate selects SHA-NI or ARMv8 SHA2 instructions at runtime.
+//!
+//! Exported with the C ABI and loaded by pow_rs.py through ctypes, which
+//! checks the arguments and releases the GIL for the call.
+//!
+//! Build: cargo build --release --manifest-path pow_rs_package/Cargo.toml
+
+use sha2::{Digest, Sha256};
+use std::slice;
+
+/// True when `digest` starts with `bits` zero bits.
+fn leading_zero_bits(digest: &[u8], bits: u32) -> bool {
+    let full = (bits / 8) as usize;
+    if digest[..full].iter().any(|&b| b != 0) {
+        return false;
+    }
+    let rest = bits % 8;
+    rest == 0 || digest[full] >> (8 - rest) == 0
+}
+
+/// First valid nonce in `start..=last`.
+fn search(prefix: &[u8], suffix: &[u8], start: u64, last: u64, bits: u32) -> Option<u64> {
+    let base = Sha256::new_with_prefix(prefix);
+    let mut digits = itoa::Buffer::new();
+    (start..=last).find(|&nonce| {
+        let mut hasher = base.clone();
+        hasher.update(digits.format(nonce).as_bytes());
+        hasher.update(suffix);
+        leading_zero_bits(&hasher.finalize(), bits)
+    })
+}
+
+/// Writes the first valid nonce in `start..=last` to `nonce` and returns true,
+/// or returns false when none is valid. `bits` must be at most 256.
+///
+/// # Safety
+///
+/// `prefix` and `suffix` must point to `prefix_len` and `suffix_len` readable
+/// bytes, and `nonce` to a writable u64.
+#[no_mangle]
+pub unsafe extern "C" fn pow_rs_search(
+    prefix: *const u8,
+    prefix_len: usize,
+    suffix: *const u8,
+    suffix_len: usize,
+    start: u64,
+    last: u64,
+    bits: u32,
+    nonce: *mut u64,
+) -> bool {
+    if bits > 256 {
+        return false;
+    }
+    let prefix = slice::from_raw_parts(prefix, prefix_len);
+    let suffix = slice::from_raw_parts(suffix, suffix_len);
+    match search(prefix, suffix, start, last, bits) {
+        Some(found) => {
+            *nonce = found;
+            true
+        }
+        None => false,
+    }
+}
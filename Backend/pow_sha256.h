@@ -0,0 +1,206 @@
+/*
+ * Shared pieces of the native proof-of-work searches (pow_shani, pow_avx2):
+ * SHA-256 constants, a portable compression function and the nonce search
+ * loop that lays out prefix + str(nonce) + suffix with its padding.
+ */
+#ifndef POW_SHA256_H
+#define POW_SHA256_H
+
+#include <limits.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+/* Longest decimal rendering of an unsigned 64-bit nonce. */
+#define NONCE_DIGITS_MAX 20
+
+typedef void (*transform_fn)(uint32_t state[8], const unsigned char *data, size_t blocks);
+
+static const uint32_t K[64] = {
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+};
+
+static const uint32_t IV[8] = {
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+};
+
+/* --- Portable compression --- */
+
+#define ROTR(x, n) (((x) >> (n)) | ((x) << (32 - (n))))
+
+static void
+transform_scalar(uint32_t state[8], const unsigned char *data, size_t blocks)
+{
+    uint32_t w[64];
+    int i;
+
+    while (blocks--) {
+        uint32_t a = state[0], b = state[1], c = state[2], d = state[3];
+        uint32_t e = state[4], f = state[5], g = state[6], h = state[7];
+
+        for (i = 0; i < 16; i++) {
+            w[i] = ((uint32_t)data[4 * i] << 24) | ((uint32_t)data[4 * i + 1] << 16) |
+                   ((uint32_t)data[4 * i + 2] << 8) | (uint32_t)data[4 * i + 3];
+        }
+        for (i = 16; i < 64; i++) {
+            uint32_t s0 = ROTR(w[i - 15], 7) ^ ROTR(w[i - 15], 18) ^ (w[i - 15] >> 3);
+            uint32_t s1 = ROTR(w[i - 2], 17) ^ ROTR(w[i - 2], 19) ^ (w[i - 2] >> 10);
+            w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+        }
+        for (i = 0; i < 64; i++) {
+            uint32_t t1 = h + (ROTR(e, 6) ^ ROTR(e, 11) ^ ROTR(e, 25)) + ((e & f) ^ (~e & g)) + K[i] + w[i];
+            uint32_t t2 = (ROTR(a, 2) ^ ROTR(a, 13) ^ ROTR(a, 22)) + ((a & b) ^ (a & c) ^ (b & c));
+            h = g; g = f; f = e; e = d + t1;
+            d = c; c = b; b = a; a = t1 + t2;
+        }
+
+        state[0] += a; state[1] += b; state[2] += c; state[3] += d;
+        state[4] += e; state[5] += f; state[6] += g; state[7] += h;
+        data += 64;
+    }
+}
+
+/* --- Nonce search --- */
+
+/* True when the digest held in `state` starts with `bits` zero bits. */
+static int
+leading_zero_bits(const uint32_t state[8], unsigned bits)
+{
+    unsigned i;
+
+    for (i = 0; bits >= 32; i++, bits -= 32) {
+        if (state[i])
+            return 0;
+    }
+    return bits == 0 || (state[i] >> (32 - bits)) == 0;
+}
+
+static int
+format_nonce(unsigned char *out, unsigned long long nonce)
+{
+    char digits[NONCE_DIGITS_MAX];
+    int n = 0, i;
+
+    do {
+        digits[n++] = (char)('0' + nonce % 10);
+        nonce /= 10;
+    } while (nonce);
+    for (i = 0; i < n; i++)
+        out[i] = (unsigned char)digits[n - 1 - i];
+    return n;
+}
+
+/*
+ * Lays out prefix + nonce + suffix with SHA-256 padding in `buf`.
+ * Returns the number of 64-byte blocks.
+ */
+static size_t
+build_message(unsigned char *buf, const unsigned char *prefix, size_t plen,
+              const unsigned char *suffix, size_t slen, unsigned long long nonce, int *ndigits)
+{
+    size_t len, blocks, padded;
+    uint64_t bitlen;
+    int i;
+
+    *ndigits = format_nonce(buf + plen, nonce);
+    len = plen + (size_t)*ndigits + slen;
+    memcpy(buf, prefix, plen);
+    memcpy(buf + plen + *ndigits, suffix, slen);
+
+    blocks = (len + 8) / 64 + 1;
+    padded = blocks * 64;
+    buf[len] = 0x80;
+    memset(buf + len + 1, 0, padded - len - 1);
+    bitlen = (uint64_t)len * 8;
+    for (i = 0; i < 8; i++)
+        buf[padded - 1 - i] = (unsigned char)(bitlen >> (8 * i));
+    return blocks;
+}
+
+/* Last nonce of a search over `count` nonces from `start`; 0 means unbounded. */
+static unsigned long long
+search_last(unsigned long long start, unsigned long long count)
+{
+    if (count == 0 || start > ULLONG_MAX - (count - 1))
+        return ULLONG_MAX;
+    return start + (count - 1);
+}
+
+/* First nonce with `ndigits + 1` digits, or 0 when that would overflow. */
+static unsigned long long
+width_limit(int ndigits)
+{
+    unsigned long long limit = 1;
+    int i;
+
+    for (i = 0; i < ndigits; i++) {
+        if (limit > ULLONG_MAX / 10)
+            return 0;
+        limit *= 10;
+    }
+    return limit;
+}
+
+/*
+ * Tries nonces from `nonce` through `last` inclusive. Returns 0 and stores the
+ * winning nonce in `*found`, 1 when none of them is valid, -1 when the buffer
+ * cannot be allocated.
+ */
+static int
+search_nonce(transform_fn transform, const unsigned char *prefix, size_t plen,
+             const unsigned char *suffix, size_t slen, unsigned long long nonce,
+             unsigned long long last, unsigned bits, unsigned long long *found)
+{
+    unsigned char *buf = malloc(plen + NONCE_DIGITS_MAX + slen + 128);
+
+    if (buf == NULL)
+        return -1;
+
+    for (;;) {
+        uint32_t mid[8], st[8];
+        unsigned long long limit;
+        size_t blocks, skip;
+        int ndigits, i;
+
+        blocks = build_message(buf, prefix, plen, suffix, slen, nonce, &ndigits);
+        limit = width_limit(ndigits);
+        skip = plen / 64;
+        memcpy(mid, IV, sizeof(mid));
+        if (skip)
+            transform(mid, buf, skip);
+
+        for (;;) {
+            memcpy(st, mid, sizeof(st));
+            transform(st, buf + skip * 64, blocks - skip);
+            if (leading_zero_bits(st, bits)) {
+                free(buf);
+                *found = nonce;
+                return 0;
+            }
+            if (nonce == last) {
+                free(buf);
+                return 1;
+            }
+            if (++nonce == limit)
+                break;
+            /* Same width: bump the ASCII digits in place. */
+            for (i = ndigits - 1; i >= 0; i--) {
+                unsigned char *digit = buf + plen + i;
+                if (*digit != '9') {
+                    (*digit)++;
+                    break;
+                }
+                *digit = '0';
+            }
+        }
+    }
+}
+
+#endif /* POW_SHA256_H */
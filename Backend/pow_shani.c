@@ -0,0 +1,291 @@
+/*
+ * pow_shani: native nonce search for Blockchain.proof_of_work.
+ *
+ * Finds the first nonce >= start such that
+ *     sha256(prefix + str(nonce) + suffix)
+ * starts with `bits` zero bits -- the same rule as
+ * Blockchain.valid_proof, so proofs found here validate in pure Python.
+ *
+ * The message is laid out once per nonce width (1, 2, 3 ... digits) with its
+ * SHA-256 padding already in place; every attempt only bumps the ASCII digits
+ * in place and compresses the blocks from the one holding the nonce onward.
+ * Full 64-byte blocks in front of the nonce are compressed once (midstate).
+ *
+ * Compression uses the x86 SHA extensions (SHA-NI) or the ARMv8 SHA-2
+ * instructions when the CPU has them, checked once at import, and portable C
+ * otherwise. No special compiler flags are needed for either.
+ * The layout follows noloader/SHA-Intrinsics and Bitcoin Core's
+ * sha256_shani.cpp.
+ *
+ * Build: python setup.py build_ext --inplace
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include "pow_sha256.h"
+
+#if defined(__x86_64__) || defined(__i386__)
+#include <immintrin.h>
+#define POW_X86 1
+#endif
+
+#if defined(__aarch64__)
+#include <arm_neon.h>
+#define POW_ARMV8 1
+#if defined(__linux__)
+#include <sys/auxv.h>
+#ifndef HWCAP_SHA2
+#define HWCAP_SHA2 (1 << 6)
+#endif
+#endif
+/* Only transform_armv8 uses the SHA-2 instructions, so the module still loads on CPUs without them. */
+#if defined(__clang__)
+#define ARMV8_SHA2 __attribute__((target("sha2")))
+#else
+#define ARMV8_SHA2 __attribute__((target("+crypto")))
+#endif
+#endif
+
+/* --- x86 SHA extensions --- */
+
+#ifdef POW_X86
+__attribute__((target("sha,sse4.1,ssse3")))
+static void
+transform_shani(uint32_t state[8], const unsigned char *data, size_t blocks)
+{
+    const __m128i bswap = _mm_set_epi64x(0x0c0d0e0f08090a0bULL, 0x0405060700010203ULL);
+    __m128i st0, st1, tmp;
+    int i;
+
+    /* Reorder the state into the ABEF / CDGH halves SHA256RNDS2 expects. */
+    tmp = _mm_shuffle_epi32(_mm_loadu_si128((const __m128i *)&state[0]), 0xB1);
+    st1 = _mm_shuffle_epi32(_mm_loadu_si128((const __m128i *)&state[4]), 0x1B);
+    st0 = _mm_alignr_epi8(tmp, st1, 8);
+    st1 = _mm_blend_epi16(st1, tmp, 0xF0);
+
+    while (blocks--) {
+        const __m128i abef = st0, cdgh = st1;
+        __m128i m[4];
+
+        for (i = 0; i < 4; i++)
+            m[i] = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(data + 16 * i)), bswap);
+
+        /* Sixteen groups of four rounds; m[i & 3] is rolled forward as W. */
+        for (i = 0; i < 16; i++) {
+            __m128i wk;
+            if (i >= 4) {
+                tmp = _mm_sha256msg1_epu32(m[i & 3], m[(i + 1) & 3]);
+                tmp = _mm_add_epi32(tmp, _mm_alignr_epi8(m[(i + 3) & 3], m[(i + 2) & 3], 4));
+                m[i & 3] = _mm_sha256msg2_epu32(tmp, m[(i + 3) & 3]);
+            }
+            wk = _mm_add_epi32(m[i & 3], _mm_loadu_si128((const __m128i *)&K[4 * i]));
+            st1 = _mm_sha256rnds2_epu32(st1, st0, wk);
+            st0 = _mm_sha256rnds2_epu32(st0, st1, _mm_shuffle_epi32(wk, 0x0E));
+        }
+
+        st0 = _mm_add_epi32(st0, abef);
+        st1 = _mm_add_epi32(st1, cdgh);
+        data += 64;
+    }
+
+    tmp = _mm_shuffle_epi32(st0, 0x1B);
+    st1 = _mm_shuffle_epi32(st1, 0xB1);
+    _mm_storeu_si128((__m128i *)&state[0], _mm_blend_epi16(tmp, st1, 0xF0));
+    _mm_storeu_si128((__m128i *)&state[4], _mm_alignr_epi8(st1, tmp, 8));
+}
+#endif
+
+/* --- ARMv8 crypto extensions --- */
+
+#ifdef POW_ARMV8
+ARMV8_SHA2
+static void
+transform_armv8(uint32_t state[8], const unsigned char *data, size_t blocks)
+{
+    uint32x4_t st0 = vld1q_u32(&state[0]), st1 = vld1q_u32(&state[4]);
+    int i;
+
+    while (blocks--) {
+        const uint32x4_t abcd = st0, efgh = st1;
+        uint32x4_t m[4];
+
+        for (i = 0; i < 4; i++)
+            m[i] = vreinterpretq_u32_u8(vrev32q_u8(vld1q_u8(data + 16 * i)));
+
+        for (i = 0; i < 16; i++) {
+            uint32x4_t wk, prev;
+            if (i >= 4)
+                m[i & 3] = vsha256su1q_u32(vsha256su0q_u32(m[i & 3], m[(i + 1) & 3]),
+                                           m[(i + 2) & 3], m[(i + 3) & 3]);
+            wk = vaddq_u32(m[i & 3], vld1q_u32(&K[4 * i]));
+            prev = st0;
+            st0 = vsha256hq_u32(st0, st1, wk);
+            st1 = vsha256h2q_u32(st1, prev, wk);
+        }
+
+        st0 = vaddq_u32(st0, abcd);
+        st1 = vaddq_u32(st1, efgh);
+        data += 64;
+    }
+
+    vst1q_u32(&state[0], st0);
+    vst1q_u32(&state[4], st1);
+}
+
+static int
+have_armv8_sha2(void)
+{
+#if defined(__ARM_FEATURE_SHA2) || defined(__APPLE__)
+    /* Built for the crypto extensions, or Apple silicon, which always has them. */
+    return 1;
+#elif defined(__linux__)
+    return (getauxval(AT_HWCAP) & HWCAP_SHA2) != 0;
+#else
+    return 0;
+#endif
+}
+#endif
+
+static transform_fn
+select_transform(void)
+{
+#ifdef POW_ARMV8
+    if (have_armv8_sha2())
+        return transform_armv8;
+#endif
+#ifdef POW_X86
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("sha"))
+        return transform_shani;
+#endif
+    return transform_scalar;
+}
+
+static transform_fn active_transform;
+
+PyDoc_STRVAR(search_doc,
+"search(prefix, suffix, start, bits, count=0) -> int | None\n\n"
+"Return the first nonce >= start such that sha256(prefix + str(nonce) + suffix)\n"
+"starts with `bits` zero bits. With count > 0 only nonces below\n"
+"start + count are tried, and None is returned when none of them is valid.\n"
+"Runs without holding the GIL.");
+
+static PyObject *
+pow_search(PyObject *self, PyObject *args)
+{
+    const unsigned char *prefix, *suffix;
+    Py_ssize_t plen, slen;
+    PyObject *start_obj, *count_obj = NULL;
+    unsigned long long start, count = 0, last, found = 0;
+    int bits, rc;
+
+    /* Not "K", which wraps out-of-range ints silently: negative or >= 2**64 raises OverflowError */
+    if (!PyArg_ParseTuple(args, "y#y#Oi|O:search", &prefix, &plen, &suffix, &slen, &start_obj, &bits, &count_obj))
+        return NULL;
+    start = PyLong_AsUnsignedLongLong(start_obj);
+    if (start == (unsigned long long)-1 && PyErr_Occurred())
+        return NULL;
+    if (count_obj != NULL) {
+        count = PyLong_AsUnsignedLongLong(count_obj);
+        if (count == (unsigned long long)-1 && PyErr_Occurred())
+            return NULL;
+    }
+    if (bits < 0 || bits > 256) {
+        PyErr_SetString(PyExc_ValueError, "bits must be between 0 and 256");
+        return NULL;
+    }
+
+    last = search_last(start, count);
+
+    Py_BEGIN_ALLOW_THREADS
+    rc = search_nonce(active_transform, prefix, (size_t)plen, suffix, (size_t)slen, start, last,
+                      (unsigned)bits, &found);
+    Py_END_ALLOW_THREADS
+
+    if (rc == -1)
+        return PyErr_NoMemory();
+    if (rc == 1) {
+        if (count)
+            Py_RETURN_NONE;
+        PyErr_SetString(PyExc_OverflowError, "no proof below 2**64");
+        return NULL;
+    }
+    return PyLong_FromUnsignedLongLong(found);
+}
+
+/* Padding block shared by every 64-byte message: 0x80, zeros, bit length 512. */
+static const unsigned char PAD64[64] = {
+    0x80, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0x02, 0x00,
+};
+
+PyDoc_STRVAR(sha256_many_doc,
+"sha256_many(data) -> bytes\n\n"
+"Hash every 64-byte chunk of data (a pair of child hashes in a Merkle level)\n"
+"and return the 32-byte digests concatenated. Runs without holding the GIL.");
+
+static PyObject *
+pow_sha256_many(PyObject *self, PyObject *args)
+{
+    const unsigned char *data;
+    unsigned char *out;
+    Py_ssize_t len, i;
+    PyObject *result;
+
+    if (!PyArg_ParseTuple(args, "y#:sha256_many", &data, &len))
+        return NULL;
+    if (len % 64) {
+        PyErr_SetString(PyExc_ValueError, "data length must be a multiple of 64");
+        return NULL;
+    }
+    result = PyBytes_FromStringAndSize(NULL, len / 2);
+    if (result == NULL)
+        return NULL;
+    out = (unsigned char *)PyBytes_AS_STRING(result);
+
+    Py_BEGIN_ALLOW_THREADS
+    for (i = 0; i < len / 64; i++) {
+        uint32_t st[8];
+        int j;
+
+        memcpy(st, IV, sizeof(st));
+        active_transform(st, data + 64 * i, 1);
+        active_transform(st, PAD64, 1);
+        for (j = 0; j < 8; j++) {
+            out[32 * i + 4 * j] = (unsigned char)(st[j] >> 24);
+            out[32 * i + 4 * j + 1] = (unsigned char)(st[j] >> 16);
+            out[32 * i + 4 * j + 2] = (unsigned char)(st[j] >> 8);
+            out[32 * i + 4 * j + 3] = (unsigned char)st[j];
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    return result;
+}
+
+static PyMethodDef pow_methods[] = {
+    {"search", pow_search, METH_VARARGS, search_doc},
+    {"sha256_many", pow_sha256_many, METH_VARARGS, sha256_many_doc},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef pow_module = {
+    PyModuleDef_HEAD_INIT, "pow_shani", "SHA-256 nonce search and batch hashing for the blockchain.", -1, pow_methods,
+};
+
+PyMODINIT_FUNC
+PyInit_pow_shani(void)
+{
+    PyObject *m = PyModule_Create(&pow_module);
+
+    if (m == NULL)
+        return NULL;
+    active_transform = select_transform();
+    if (PyModule_AddIntConstant(m, "HAVE_HW_SHA", active_transform != transform_scalar) < 0) {
+        Py_DECREF(m);
+        return NULL;
+    }
+    return m;
+}
@@ -1,29 +1,138 @@
 #!/usr/bin/env python3
 """
 Simple blockchain implementation (educational).
-Run: pip install flask requests
+Run: pip install flask requests orjson
 Then: python simple_blockchain.py
+Optional: pip install ijson (validate peer chains while they download)
+Optional: python setup.py build_ext --inplace (native proof-of-work search)
+Optional: cargo build --release --manifest-path pow_rs_package/Cargo.toml (Rust proof-of-work search)
+Optional: pip install numba (compiled proof-of-work search without a C compiler)
 """
 
 import hashlib
-import json
+import math
+import os
+import threading
 import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 from uuid import uuid4
-from typing import List, Dict, Any
-from flask import Flask, request, jsonify
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import requests
+import urllib3
+import chain_check  # needs orjson
+
+try:
+    import _chain_check  # chain_check.py compiled by mypyc, see setup.py
+except ImportError:
+    _chain_check = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
+try:
+    import pow_shani  # optional C extensions, see setup.py
+except ImportError:
+    pow_shani = None
+try:
+    import pow_avx2
+except ImportError:
+    pow_avx2 = None
+try:
+    import pow_rs  # loads the Rust crate in pow_rs_package/ once built
+except ImportError:
+    pow_rs = None
+try:
+    import pow_numba  # needs numba
+except ImportError:
+    pow_numba = None
+
+# chain_check.py holds the consensus rules, so its compiled build is used only while it matches the
+# source: a build from before the last edit would accept or reject peer chains by the old rules.
+if _chain_check is not None:
+    with open(chain_check.__file__, 'rb') as f:
+        if hashlib.sha256(f.read()).hexdigest() == _chain_check.SOURCE_SHA256:
+            chain_check = _chain_check
+        else:
+            warnings.warn("_chain_check is older than chain_check.py and is not used; "
+                          "rebuild it with python setup.py build_ext --inplace")
+Block = chain_check.Block
 
 # --- Configuration ---
-DIFFICULTY = 4  # number of leading zeros required in PoW hash (in hex). Increase to make mining harder.
+DIFFICULTY_BITS = 16  # leading zero bits required in PoW hash (16 = 4 hex zeros). Increase to make mining harder.
+
+# A proof is valid when the digest, read as a big-endian 256-bit integer, is below TARGET
+TARGET = 1 << (256 - DIFFICULTY_BITS)
+
+# The same rule on the raw digest bytes, for the mining loop: whole zero bytes,
+# plus the leading DIFFICULTY_BITS % 8 bits of the next byte.
+ZERO_BYTES = DIFFICULTY_BITS // 8
+ZERO_PREFIX = bytes(ZERO_BYTES)
+TAIL_MASK = (0xFF00 >> DIFFICULTY_BITS % 8) & 0xFF
+
+# Fastest native nonce search available: x86 or ARMv8 SHA instructions, then AVX2 8-way, then Rust
+# (which uses SHA instructions itself when present), then portable C, then Numba.
+if pow_shani is not None and pow_shani.HAVE_HW_SHA:
+    native_search = pow_shani.search
+elif pow_avx2 is not None and pow_avx2.HAVE_AVX2:
+    native_search = pow_avx2.mine
+elif pow_rs is not None:
+    native_search = pow_rs.mine
+elif pow_shani is not None:
+    native_search = pow_shani.search
+elif pow_avx2 is not None:
+    native_search = pow_avx2.mine
+elif pow_numba is not None:
+    native_search = pow_numba.search
+else:
+    native_search = None
+
+# hashlib.sha256 is OpenSSL's constructor on standard CPython builds, and OpenSSL picks SHA-NI or
+# AVX2 code at runtime. Builds without OpenSSL fall back to the much slower bundled _sha256.
+OPENSSL_SHA256 = hashlib.sha256.__module__ == '_hashlib'
+
+# Hashes every pair of a Merkle level in one native call; None falls back to hashlib
+sha256_many = pow_shani.sha256_many if pow_shani is not None else None
+
+# Threads sharing one native nonce search; Numba already spreads each call across every core
+if pow_numba is not None and native_search is pow_numba.search:
+    POW_WORKERS = 1
+else:
+    POW_WORKERS = os.cpu_count() or 1
+POW_CHUNK = 1 << 16  # nonces per native call, and how often a worker checks whether another one won
+
+# One pooled session for peer requests, so repeated /nodes/resolve calls reuse kept-alive connections
+http_session = requests.Session()
+http_session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=32))
+
+# What a bad peer response can raise: requests' JSONDecodeError is a RequestException, ijson has its own.
+# ijson reads resp.raw directly, so a dropped or timed-out stream surfaces as a urllib3 error instead.
+# json raises RecursionError on deeply nested bodies (ijson is limited by MAX_JSON_DEPTH instead).
+PEER_ERRORS = (requests.RequestException, urllib3.exceptions.HTTPError, RecursionError) + (
+    (ijson.JSONError,) if ijson is not None else ())
+
+# What a malformed peer block raises, from Block.from_dict or from hashing its fields
+BLOCK_ERRORS = (KeyError, TypeError, ValueError)
+
+# ijson gives each event a dotted prefix holding all its parents, and builds the events for a whole
+# read buffer at once, so nested brackets cost quadratic time and memory: 16 KB of them took 600 MB.
+# Peer chains are read in small buffers and rejected past MAX_JSON_DEPTH nested containers.
+MAX_JSON_DEPTH = 64  # a /chain body nests 5 deep down to each transaction, plus what its fields hold
+IJSON_BUF_SIZE = 1024  # also faster than ijson's default 64 KB here
 
 # --- Blockchain class ---
 class Blockchain:
     def __init__(self):
-        self.chain: List[Dict[str, Any]] = []
+        self.chain: List[Block] = []
         self.current_transactions: List[Dict[str, Any]] = []
+        self.tx_hashes: List[bytes] = []  # leaf hashes of current_transactions
         self.nodes = set()
+        # Serialized JSON of each block, and of the whole chain until it next changes (see chain_json)
+        self._block_json: List[bytes] = []
+        self._chain_json_cache: Optional[bytes] = None
 
         # Create the genesis block
         self.new_block(proof=100, previous_hash="1")
@@ -41,124 +150,268 @@ class Blockchain:
         else:
             raise ValueError("Invalid node URL")
 
-    def valid_chain(self, chain: List[Dict[str, Any]]) -> bool:
+    def valid_chain(self, chain: Iterable[Block]) -> bool:
         """
-        Determine if a given blockchain is valid:
-        - hashes link up
-        - proofs are valid according to PoW rules
+        See chain_check.valid_chain, which mypyc can compile.
         """
-        last_block = chain[0]
-        current_index = 1
-
-        while current_index < len(chain):
-            block = chain[current_index]
-            # Check that the hash of the block is correct
-            if block['previous_hash'] != self.hash(last_block):
-                return False
-
-            # Check that the proof is valid
-            if not self.valid_proof(last_block['proof'], block['proof'], last_block['previous_hash'] if 'previous_hash' in last_block else self.hash(last_block)):
-                return False
-
-            last_block = block
-            current_index += 1
-
-        return True
+        return chain_check.valid_chain(chain, TARGET, sha256_many)
 
     def resolve_conflicts(self) -> bool:
         """
         Consensus algorithm: replace chain with the longest one in the network if valid.
         Returns True if our chain was replaced.
         """
-        neighbours = self.nodes
-        new_chain = None
-
-        max_length = len(self.chain)
+        neighbours = list(self.nodes)
+        if not neighbours:
+            return False
 
-        for node in neighbours:
-            try:
-                resp = requests.get(f'http://{node}/chain', timeout=5)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    length = data['length']
-                    chain = data['chain']
-                    if length > max_length and self.valid_chain(chain):
-                        max_length = length
-                        new_chain = chain
-            except requests.RequestException:
-                # couldn't reach node — skip
-                continue
-
-        if new_chain:
-            self.chain = new_chain
-            return True
+        peers = []
+        try:
+            # Query all neighbours at once, so consensus waits for the slowest peer rather than the sum.
+            # Only each declared length is read here; the blocks stay unread until validated.
+            with ThreadPoolExecutor(max_workers=min(32, len(neighbours))) as executor:
+                for peer in executor.map(self.open_chain, neighbours):
+                    if peer is not None:
+                        peers.append(peer)
+
+            # Validate the longest claim first and stop at the first valid one, so normally only one
+            # chain is checked in full. A peer whose blocks don't match its declared length is skipped.
+            peers.sort(key=lambda peer: peer[0], reverse=True)
+            for length, _, blocks in peers:
+                if length <= len(self.chain):
+                    break
+                chain = self.read_chain(blocks)
+                if chain is not None and len(chain) == length:
+                    self.chain = chain
+                    self._block_json = [self.serialize(block.to_dict()) for block in chain]
+                    self._chain_json_cache = None
+                    return True
+        finally:
+            for _, resp, _ in peers:
+                resp.close()
 
         return False
 
-    def new_block(self, proof: int, previous_hash: str = None) -> Dict[str, Any]:
+    def open_chain(self, node: str) -> Optional[Tuple[int, requests.Response, Iterable[Dict[str, Any]]]]:
+        """
+        Requests a neighbour's chain and reads only its declared length.
+        Returns (length, response, blocks) with the blocks not yet parsed,
+        or None if the node could not be reached or sent no usable length.
+        """
+        try:
+            resp = http_session.get(f'http://{node}/chain', timeout=5, stream=True)
+        except PEER_ERRORS:
+            # couldn't reach node — skip
+            return None
+        try:
+            if resp.status_code == 200:
+                length, blocks = self.stream_chain(resp)
+                if type(length) is int:
+                    return length, resp, blocks
+        except PEER_ERRORS + BLOCK_ERRORS:
+            # connection dropped or malformed JSON — skip
+            pass
+        resp.close()
+        return None
+
+    def read_chain(self, blocks: Iterable[Dict[str, Any]]) -> Optional[List[Block]]:
+        """
+        Builds a neighbour's chain, validating blocks as they arrive.
+        Returns the chain, or None if it is invalid or the download fails.
+        """
+        chain: List[Block] = []
+
+        def build():
+            for data in blocks:
+                block = Block.from_dict(data)
+                chain.append(block)
+                yield block
+
+        try:
+            if not self.valid_chain(build()):
+                return None
+        except PEER_ERRORS + BLOCK_ERRORS:
+            # connection dropped, malformed JSON or a malformed block — skip
+            return None
+        return chain
+
+    @staticmethod
+    def stream_chain(resp: requests.Response) -> Tuple[Any, Iterable[Dict[str, Any]]]:
+        """
+        Reads the declared length of a /chain response and returns it with an iterator over the blocks.
+        With ijson the blocks are parsed as they are consumed; otherwise the body is loaded whole.
+        /chain sends "length" before "chain" so the blocks can stay unread. A body that sends
+        "chain" first (such as the old jsonify output) is loaded whole and its blocks are counted.
+        The length is None when the body is not a JSON object with a length and a chain.
+        """
+        if ijson is None:
+            data = resp.json()
+            if not isinstance(data, dict) or not isinstance(data.get('chain'), list):
+                return None, iter(())
+            return data.get('length'), iter(data['chain'])
+        resp.raw.decode_content = True
+        events = Blockchain._limit_depth(ijson.parse(resp.raw, use_float=True, buf_size=IJSON_BUF_SIZE))
+        for prefix, event, value in events:
+            if prefix == 'length':
+                return value, ijson.items(events, 'chain.item')
+            if prefix == 'chain' and event == 'start_array':
+                blocks = list(ijson.items(events, 'chain.item'))
+                return len(blocks), iter(blocks)
+        return None, iter(())
+
+    @staticmethod
+    def _limit_depth(events: Iterable[Tuple[str, str, Any]]) -> Iterable[Tuple[str, str, Any]]:
+        """
+        Passes ijson.parse events through, raising ijson.JSONError past MAX_JSON_DEPTH nested containers.
+        """
+        depth = 0
+        for event in events:
+            kind = event[1]
+            if kind == 'start_map' or kind == 'start_array':
+                depth += 1
+                if depth > MAX_JSON_DEPTH:
+                    raise ijson.JSONError("JSON nested too deeply")
+            elif kind == 'end_map' or kind == 'end_array':
+                depth -= 1
+            yield event
+
+    def new_block(self, proof: int, previous_hash: str = None) -> Block:
         """
         Create a new Block in the Blockchain
         """
-        block = {
-            'index': len(self.chain) + 1,
-            'timestamp': time.time(),
-            'transactions': self.current_transactions,
-            'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.chain[-1]),
-        }
+        block = Block(
+            index=len(self.chain) + 1,
+            timestamp=time.time(),
+            transactions=tuple(self.current_transactions),
+            proof=proof,
+            previous_hash=previous_hash or self.hash(self.chain[-1]),
+            merkle_root=self.merkle_root(self.tx_hashes),
+        )
 
         # Reset the current list of transactions
         self.current_transactions = []
+        self.tx_hashes = []
 
         self.chain.append(block)
+        self._block_json.append(self.serialize(block.to_dict()))
+        self._chain_json_cache = None
         return block
 
+    def chain_json(self) -> bytes:
+        """
+        The chain as a JSON array, cached until a block is added or the chain is replaced.
+        Each block is serialized once; a rebuild only joins the cached pieces.
+        """
+        if self._chain_json_cache is None:
+            self._chain_json_cache = b'[' + b','.join(self._block_json) + b']'
+        return self._chain_json_cache
+
     def new_transaction(self, sender: str, recipient: str, amount: float) -> int:
         """
         Creates a new transaction to go into the next mined Block.
         Returns the index of the block that will hold this transaction.
         """
-        self.current_transactions.append({
+        transaction = {
             'sender': sender,
             'recipient': recipient,
             'amount': amount,
-        })
-        return self.last_block['index'] + 1
+        }
+        self.current_transactions.append(transaction)
+        self.tx_hashes.append(hashlib.sha256(self.serialize(transaction)).digest())
+        return self.last_block.index + 1
+
+    serialize = staticmethod(chain_check.serialize)
 
     @staticmethod
-    def hash(block: Dict[str, Any]) -> str:
+    def hash(block: Block) -> str:
         """
-        Creates a SHA-256 hash of a Block (after sorting keys).
+        The SHA-256 hash of a Block's header, computed when the Block was created.
         """
-        # We must ensure the dictionary is ordered to produce consistent hashes
-        block_string = json.dumps(block, sort_keys=True).encode()
-        return hashlib.sha256(block_string).hexdigest()
+        return block.block_hash
+
+    @staticmethod
+    def merkle_root(tx_hashes: List[bytes]) -> str:
+        """
+        See chain_check.merkle_root; uses the native pair hasher when built.
+        """
+        return chain_check.merkle_root(tx_hashes, sha256_many)
 
     @property
-    def last_block(self) -> Dict[str, Any]:
+    def last_block(self) -> Block:
         return self.chain[-1]
 
     def proof_of_work(self, last_proof: int, last_hash: str) -> int:
         """
         Simple Proof of Work:
-        - Find a number p such that hash(last_proof, p, last_hash) has DIFFICULTY leading zeros.
+        - Find a number p such that hash(last_proof, p, last_hash) has DIFFICULTY_BITS leading zero bits.
         """
+        if native_search is not None:
+            prefix, suffix = str(last_proof).encode(), last_hash.encode()
+            if POW_WORKERS > 1:
+                return self._parallel_search(prefix, suffix)
+            return native_search(prefix, suffix, 0, DIFFICULTY_BITS)
+
+        check = self._proof_checker(last_proof, last_hash)
         proof = 0
-        target = '0' * DIFFICULTY
-        while not self.valid_proof(last_proof, proof, last_hash, target):
+        while not check(proof):
             proof += 1
         return proof
 
     @staticmethod
-    def valid_proof(last_proof: int, proof: int, last_hash: str, target: str = None) -> bool:
+    def _parallel_search(prefix: bytes, suffix: bytes) -> int:
+        """
+        Runs native_search on POW_WORKERS threads at once; it releases the GIL, so they share the cores.
+        Worker i takes chunks i, i + POW_WORKERS, ... of POW_CHUNK nonces, so no nonce is tried twice,
+        and stops once any worker has found a proof. The proof returned is valid but not always the lowest.
+        If a search raises (out of memory, or past the last nonce), every worker stops and the error is raised here.
+        """
+        found = threading.Event()
+
+        def worker(first: int) -> Optional[int]:
+            start = first * POW_CHUNK
+            try:
+                while not found.is_set():
+                    proof = native_search(prefix, suffix, start, DIFFICULTY_BITS, POW_CHUNK)
+                    if proof is not None:
+                        return proof
+                    start += POW_WORKERS * POW_CHUNK
+                return None
+            finally:
+                # Also on an exception, or the other workers would search forever and the pool never exit
+                found.set()
+
+        with ThreadPoolExecutor(max_workers=POW_WORKERS) as pool:
+            for future in as_completed([pool.submit(worker, i) for i in range(POW_WORKERS)]):
+                proof = future.result()
+                if proof is not None:
+                    return proof
+        # A worker only returns None after another one has returned a proof or raised
+        raise RuntimeError("no worker returned a proof")
+
+    @staticmethod
+    def valid_proof(last_proof: int, proof: int, last_hash: str) -> bool:
+        """
+        See chain_check.valid_proof; checks against TARGET.
+        """
+        return chain_check.valid_proof(last_proof, proof, last_hash, TARGET)
+
+    @staticmethod
+    def _proof_checker(last_proof: int, last_hash: str):
         """
-        Validates the proof: does hash(last_proof, proof, last_hash) start with DIFFICULTY zeroes?
+        Returns valid_proof specialized for one (last_proof, last_hash), for the mining loop.
+        Everything fixed during the search is encoded once and bound as a default argument,
+        which CPython reads as a fast local; the difficulty check is inlined as a byte compare,
+        which is cheaper than building the integer.
+        The prefix is hashed once and each attempt copies that state, so no message is concatenated.
         """
-        if target is None:
-            target = '0' * DIFFICULTY
-        guess = f'{last_proof}{proof}{last_hash}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:len(target)] == target
+        def check(proof, _copy=hashlib.sha256(str(last_proof).encode()).copy,
+                  _suffix=last_hash.encode(), _n=ZERO_BYTES, _zeros=ZERO_PREFIX, _mask=TAIL_MASK):
+            h = _copy()
+            h.update(b'%d' % proof)
+            h.update(_suffix)
+            digest = h.digest()
+            return digest[:_n] == _zeros and (not _mask or not digest[_n] & _mask)
+        return check
 
 
 # --- Flask app (API) ---
@@ -175,7 +428,7 @@ blockchain = Blockchain()
 def mine():
     # We run proof of work to get the next proof...
     last_block = blockchain.last_block
-    last_proof = last_block['proof']
+    last_proof = last_block.proof
     last_hash = blockchain.hash(last_block)
     proof = blockchain.proof_of_work(last_proof, last_hash)
 
@@ -191,10 +444,11 @@ def mine():
 
     response = {
         'message': "New Block Forged",
-        'index': block['index'],
-        'transactions': block['transactions'],
-        'proof': block['proof'],
-        'previous_hash': block['previous_hash'],
+        'index': block.index,
+        'transactions': block.transactions,
+        'merkle_root': block.merkle_root,
+        'proof': block.proof,
+        'previous_hash': block.previous_hash,
     }
     return jsonify(response), 200
 
@@ -206,16 +460,26 @@ def new_transaction():
         return 'Missing JSON body', 400
     if not all(k in values for k in required):
         return 'Missing values', 400
+    if not isinstance(values['sender'], str) or not isinstance(values['recipient'], str):
+        return 'Invalid sender or recipient', 400
 
-    index = blockchain.new_transaction(values['sender'], values['recipient'], values['amount'])
+    # Transactions are hashed with orjson, which only encodes 64-bit integers and finite floats
+    amount = values['amount']
+    if type(amount) is int:
+        valid_amount = -2**63 <= amount < 2**64
+    else:
+        valid_amount = type(amount) is float and math.isfinite(amount)
+    if not valid_amount:
+        return 'Invalid amount', 400
+
+    index = blockchain.new_transaction(values['sender'], values['recipient'], amount)
     return jsonify({'message': f'Transaction will be added to Block {index}'}), 201
 
 @app.route('/chain', methods=['GET'])
 def full_chain():
-    return jsonify({
-        'chain': blockchain.chain,
-        'length': len(blockchain.chain),
-    }), 200
+    # 'length' goes first so a streaming reader sees it before the blocks
+    body = b'{"length":%d,"chain":%s}' % (len(blockchain.chain), blockchain.chain_json())
+    return Response(body, status=200, mimetype='application/json')
 
 @app.route('/nodes/register', methods=['POST'])
 def register_nodes():
@@ -239,16 +503,14 @@ def register_nodes():
 def consensus():
     replaced = blockchain.resolve_conflicts()
     if replaced:
-        return jsonify({
-            'message': 'Our chain was replaced',
-            'new_chain': blockchain.chain
-        }), 200
+        body = b'{"message":"Our chain was replaced","new_chain":%s}' % blockchain.chain_json()
     else:
-        return jsonify({
-            'message': 'Our chain is authoritative',
-            'chain': blockchain.chain
-        }), 200
+        body = b'{"message":"Our chain is authoritative","chain":%s}' % blockchain.chain_json()
+    return Response(body, status=200, mimetype='application/json')
 
 if __name__ == '__main__':
+    print(f"SHA-256: {'OpenSSL' if OPENSSL_SHA256 else 'bundled _sha256 (slow, link Python against OpenSSL)'}, "
+          f"nonce search: {native_search.__module__ if native_search is not None else 'hashlib'}, "
+          f"chain checks: {'compiled' if chain_check is _chain_check else 'plain Python'}")
     # Example: set FLASK_ENV=development for reloader during development
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,308 @@
+"""
+Consensus tests: resolve_conflicts against local fake peers, chain validation and the Flask API.
+Run: python -m unittest test_consensus (peers are served on 127.0.0.1; the ijson cases are skipped without ijson)
+"""
+
+import hashlib
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import chain_check
+import simple_blockchain
+from simple_blockchain import Block, Blockchain
+
+
+def mined_chain(blocks):
+    """
+    A valid chain of `blocks` blocks, each after the genesis block holding one transaction.
+    """
+    chain = Blockchain()
+    while len(chain.chain) < blocks:
+        last = chain.last_block
+        chain.new_transaction('a', 'b', len(chain.chain))
+        chain.new_block(chain.proof_of_work(last.proof, last.block_hash), last.block_hash)
+    return chain
+
+
+def chain_body(blocks, length=None):
+    """
+    A /chain response body for a list of block dicts, declaring `length` (default: the real length).
+    """
+    return json.dumps({'length': len(blocks) if length is None else length, 'chain': blocks}).encode()
+
+
+class ConsensusTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.long = mined_chain(4)
+        cls.short = mined_chain(3)
+        cls.long_blocks = json.loads(cls.long.chain_json())
+        cls.short_body = chain_body(json.loads(cls.short.chain_json()))
+
+    def serve(self, body, content_length=None):
+        """
+        Starts a fake peer answering every GET with `body`; returns its address.
+        A content_length above len(body) makes it drop the connection mid-response.
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(content_length or len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        # A short poll keeps shutdown() quick; every test starts several peers
+        threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'127.0.0.1:{server.server_port}'
+
+    def each_reader(self, check):
+        """
+        Runs check() with ijson streaming the peer chains, and with the bodies loaded whole.
+        """
+        for streamed in (True, False):
+            with self.subTest(ijson=streamed):
+                if streamed and simple_blockchain.ijson is None:
+                    self.skipTest('ijson is not installed')
+                with mock.patch.object(simple_blockchain, 'ijson', simple_blockchain.ijson if streamed else None):
+                    check()
+
+    def resolve(self, *peers):
+        """
+        Runs resolve_conflicts on a fresh one-block node; returns (replaced, node).
+        """
+        node = Blockchain()
+        for peer in peers:
+            node.register_node(peer)
+        return node.resolve_conflicts(), node
+
+    def assert_rejected(self, body, content_length=None):
+        """
+        A peer serving `body` is skipped on its own, and does not stop the next valid chain from winning.
+        """
+        bad = self.serve(body, content_length)
+        replaced, node = self.resolve(bad)
+        self.assertFalse(replaced)
+        self.assertEqual(len(node.chain), 1)
+
+        replaced, node = self.resolve(bad, self.serve(self.short_body))
+        self.assertTrue(replaced)
+        self.assertEqual(node.chain_json(), self.short.chain_json())
+
+    def test_longest_valid_chain_wins(self):
+        def check():
+            replaced, node = self.resolve(self.serve(self.short_body), self.serve(chain_body(self.long_blocks)))
+            self.assertTrue(replaced)
+            self.assertEqual(node.chain_json(), self.long.chain_json())
+            self.assertEqual([block.block_hash for block in node.chain], [block.block_hash for block in self.long.chain])
+        self.each_reader(check)
+
+    def test_shorter_chains_are_ignored(self):
+        def check():
+            replaced, node = self.resolve(self.serve(chain_body(self.long_blocks[:1])))
+            self.assertFalse(replaced)
+            self.assertEqual(len(node.chain), 1)
+        self.each_reader(check)
+
+    def test_false_length(self):
+        self.each_reader(lambda: self.assert_rejected(chain_body(self.long_blocks, length=40)))
+
+    def test_garbage_json(self):
+        def check():
+            for body in (b'not json', b'{"length":4,"chain":[{', b''):
+                with self.subTest(body=body):
+                    self.assert_rejected(body)
+        self.each_reader(check)
+
+    def test_not_an_object_with_a_chain(self):
+        def check():
+            for body in (b'[1,2,3]', json.dumps(self.long_blocks).encode(), b'{"length":4,"chain":5}',
+                         b'{"length":"4","chain":[]}', b'{"length":4}'):
+                with self.subTest(body=body):
+                    self.assert_rejected(body)
+        self.each_reader(check)
+
+    def test_bad_blocks(self):
+        def tampered(**changes):
+            return [dict(block, **changes) if block['index'] == 3 else block for block in self.long_blocks]
+
+        no_merkle_root = [{k: v for k, v in block.items() if k != 'merkle_root'} for block in self.long_blocks]
+        bad_chains = {
+            'missing key': no_merkle_root,
+            'string proof': tampered(proof='12'),
+            'float index': tampered(index=3.0),
+            'string timestamp': tampered(timestamp='now'),
+            'transactions not a list': tampered(transactions=5),
+            'block not an object': self.long_blocks[:2] + [5, 6],
+            'invalid proof': tampered(proof=self.long_blocks[2]['proof'] + 1),
+            'broken link': tampered(previous_hash='0' * 64),
+            'wrong merkle root': tampered(transactions=[{'sender': 'a', 'recipient': 'b', 'amount': 99}]),
+        }
+
+        def check():
+            for name, blocks in bad_chains.items():
+                with self.subTest(case=name):
+                    self.assert_rejected(chain_body(blocks))
+        self.each_reader(check)
+
+    def test_deeply_nested_json(self):
+        def check():
+            for body in (b'[' * 200000, b'{"length":4,"chain":[{"transactions":' + b'[' * 200000, b'{"x":' * 100000):
+                with self.subTest(body=body[:30]):
+                    self.assert_rejected(body)
+            # Nesting up to MAX_JSON_DEPTH is still read
+            nested = 'x'
+            for _ in range(simple_blockchain.MAX_JSON_DEPTH - 5):  # the body, chain, block, list, transaction
+                nested = [nested]
+            node = mined_chain(1)
+            node.new_transaction('a', 'b', 1)
+            node.current_transactions[-1]['amount'] = nested
+            node.tx_hashes[-1] = hashlib.sha256(Blockchain.serialize(node.current_transactions[-1])).digest()
+            last = node.last_block
+            node.new_block(node.proof_of_work(last.proof, last.block_hash), last.block_hash)
+            replaced, _ = self.resolve(self.serve(b'{"length":2,"chain":%s}' % node.chain_json()))
+            self.assertTrue(replaced)
+        self.each_reader(check)
+
+    def test_chain_sent_before_length(self):
+        def check():
+            body = b'{"chain":%s,"length":4}' % self.long.chain_json()
+            replaced, node = self.resolve(self.serve(body))
+            self.assertTrue(replaced)
+            self.assertEqual(node.chain_json(), self.long.chain_json())
+        self.each_reader(check)
+
+    def test_dropped_stream(self):
+        def check():
+            body = chain_body(self.long_blocks)
+            for cut in (5, len(body) // 2, len(body)):
+                with self.subTest(cut=cut):
+                    self.assert_rejected(body[:cut], content_length=len(body) + 10)
+        self.each_reader(check)
+
+    def test_unreachable_peer(self):
+        replaced, node = self.resolve('127.0.0.1:1', self.serve(self.short_body))
+        self.assertTrue(replaced)
+        self.assertEqual(len(node.chain), 3)
+
+
+class BlockTest(unittest.TestCase):
+    def setUp(self):
+        self.chain = mined_chain(3).chain
+
+    def test_round_trip(self):
+        for block in self.chain:
+            data = json.loads(Blockchain.serialize(block.to_dict()))
+            copy = Block.from_dict(data)
+            self.assertEqual(copy, block)
+            self.assertEqual(copy.block_hash, block.block_hash)
+
+    def test_from_dict_rejects_malformed_blocks(self):
+        data = self.chain[1].to_dict()
+        with self.assertRaises(KeyError):
+            Block.from_dict({k: v for k, v in data.items() if k != 'proof'})
+        for key, value in (('index', '2'), ('index', 2.0), ('index', True), ('proof', None), ('timestamp', '1'),
+                           ('previous_hash', 1), ('merkle_root', None), ('transactions', 'abc')):
+            with self.subTest(key=key, value=value), self.assertRaises(TypeError):
+                Block.from_dict(dict(data, **{key: value}))
+
+    @unittest.skipIf(simple_blockchain._chain_check is None, '_chain_check is not built')
+    def test_compiled_from_dict_matches_plain_python(self):
+        data = self.chain[1].to_dict()
+        cases = [data, dict(data, timestamp=1), dict(data, index=2.0), dict(data, transactions='x'), {}]
+        for case in cases:
+            results = []
+            for module in (chain_check, simple_blockchain._chain_check):
+                try:
+                    results.append(module.Block.from_dict(case).block_hash)
+                except (KeyError, TypeError) as exc:
+                    results.append(type(exc))
+            self.assertEqual(results[0], results[1], case)
+
+    def test_valid_chain(self):
+        node = Blockchain()
+        self.assertTrue(node.valid_chain(self.chain))
+        self.assertTrue(node.valid_chain(iter(self.chain)))
+        self.assertFalse(node.valid_chain([]))
+        self.assertFalse(node.valid_chain(self.chain[:1] + self.chain[2:]))
+
+        data = self.chain[2].to_dict()
+        for changes in ({'proof': data['proof'] + 1}, {'previous_hash': '0' * 64}, {'transactions': []}):
+            with self.subTest(changes=changes):
+                self.assertFalse(node.valid_chain(self.chain[:2] + [Block.from_dict(dict(data, **changes))]))
+
+
+class ApiTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(simple_blockchain, 'blockchain', Blockchain())
+        self.blockchain = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = simple_blockchain.app.test_client()
+
+    def test_chain_sends_length_first(self):
+        resp = self.client.get('/chain')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, 'application/json')
+        self.assertTrue(resp.data.startswith(b'{"length":1,"chain":['))
+        self.assertEqual([Block.from_dict(block) for block in resp.get_json()['chain']], self.blockchain.chain)
+
+    def test_mine(self):
+        genesis = self.blockchain.last_block
+        resp = self.client.get('/mine')
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body['index'], 2)
+        self.assertEqual(body['previous_hash'], genesis.block_hash)
+        self.assertTrue(self.blockchain.valid_proof(genesis.proof, body['proof'], genesis.block_hash))
+        self.assertEqual(body['transactions'], [{'sender': '0', 'recipient': simple_blockchain.node_identifier,
+                                                 'amount': 1}])
+
+        chain = self.client.get('/chain').get_json()
+        self.assertEqual(chain['length'], 2)
+        self.assertTrue(self.blockchain.valid_chain(Block.from_dict(block) for block in chain['chain']))
+
+    def test_new_transaction(self):
+        for amount in (5, 0.5, -2**63, 2**64 - 1):
+            with self.subTest(amount=amount):
+                resp = self.client.post('/transactions/new', json={'sender': 'a', 'recipient': 'b', 'amount': amount})
+                self.assertEqual(resp.status_code, 201)
+                self.assertEqual(resp.get_json(), {'message': 'Transaction will be added to Block 2'})
+        self.assertEqual(len(self.blockchain.current_transactions), 4)
+
+        # A mined block commits to the accepted transactions and still validates
+        self.client.get('/mine')
+        self.assertTrue(self.blockchain.valid_chain(self.blockchain.chain))
+
+    def test_new_transaction_rejects_bad_values(self):
+        bodies = [
+            {},
+            {'sender': 'a', 'recipient': 'b'},
+            {'sender': 1, 'recipient': 'b', 'amount': 5},
+            {'sender': 'a', 'recipient': None, 'amount': 5},
+            {'sender': 'a', 'recipient': 'b', 'amount': '5'},
+            {'sender': 'a', 'recipient': 'b', 'amount': True},
+            {'sender': 'a', 'recipient': 'b', 'amount': 2**64},
+            {'sender': 'a', 'recipient': 'b', 'amount': -2**63 - 1},
+            {'sender': 'a', 'recipient': 'b', 'amount': None},
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post('/transactions/new', json=body).status_code, 400)
+        for raw in (b'{"sender":"a","recipient":"b","amount":NaN}', b'{"sender":"a","recipient":"b","amount":1e999}'):
+            with self.subTest(body=raw):
+                resp = self.client.post('/transactions/new', data=raw, content_type='application/json')
+                self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self.blockchain.current_transactions, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
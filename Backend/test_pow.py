@@ -0,0 +1,137 @@
+"""
+Differential tests: every built native backend must agree with chain_check.valid_proof.
+Run: python -m unittest test_pow (backends that are not built are skipped)
+"""
+
+import hashlib
+import importlib
+import os
+import unittest
+from unittest import mock
+
+import chain_check
+import simple_blockchain
+
+
+def load(module, name):
+    try:
+        return getattr(importlib.import_module(module), name)
+    except ImportError:
+        return None
+
+
+BACKENDS = {
+    'pow_shani.search': load('pow_shani', 'search'),
+    'pow_avx2.mine': load('pow_avx2', 'mine'),
+    'pow_rs.mine': load('pow_rs', 'mine'),
+    'pow_numba.search': load('pow_numba', 'search'),
+}
+
+# str(last_proof) lengths around the 55/56/64-byte SHA-256 block boundaries
+LAST_PROOFS = [int('7' * n) for n in (1, 3, 54, 55, 56, 63, 64, 65, 119, 120)]
+LAST_HASHES = ['ab' * 32, 'x']
+# starts just below a nonce width rollover (9 -> 10, 99 -> 100, ...) and the top of the range
+STARTS = [0, 5, 95, 995, 10**12 - 3, 2**64 - 12]
+
+
+def first_proof(last_proof, last_hash, start, bits, count):
+    target = 1 << (256 - bits)
+    for proof in range(start, start + count):
+        if chain_check.valid_proof(last_proof, proof, last_hash, target):
+            return proof
+    return None
+
+
+class NonceSearchTest(unittest.TestCase):
+    def each_backend(self, check):
+        for name, search in BACKENDS.items():
+            with self.subTest(backend=name):
+                if search is None:
+                    self.skipTest(f'{name} is not built')
+                check(search)
+
+    def test_bounded_search_matches_valid_proof(self):
+        def check(search):
+            for last_proof in LAST_PROOFS:
+                for last_hash in LAST_HASHES:
+                    prefix, suffix = str(last_proof).encode(), last_hash.encode()
+                    for start in STARTS:
+                        for bits in (0, 1, 5, 8):
+                            expected = first_proof(last_proof, last_hash, start, bits, 11)
+                            self.assertEqual(search(prefix, suffix, start, bits, 11), expected,
+                                             (last_proof, last_hash, start, bits))
+        self.each_backend(check)
+
+    def test_unbounded_search_matches_valid_proof(self):
+        def check(search):
+            for last_proof in LAST_PROOFS:
+                prefix = str(last_proof).encode()
+                for start in STARTS[:-1]:
+                    expected = first_proof(last_proof, 'ab' * 32, start, 10, 1 << 16)
+                    self.assertIsNotNone(expected)
+                    self.assertEqual(search(prefix, b'ab' * 32, start, 10), expected, (last_proof, start))
+        self.each_backend(check)
+
+    def test_no_proof_in_range(self):
+        self.each_backend(lambda search: self.assertIsNone(search(b'100', b'ab' * 32, 0, 256, 50)))
+
+    def test_bits_out_of_range(self):
+        def check(search):
+            for bits in (-1, 257):
+                with self.assertRaises(ValueError):
+                    search(b'100', b'ab' * 32, 0, bits, 1)
+        self.each_backend(check)
+
+    def test_start_and_count_out_of_range(self):
+        def check(search):
+            for start, count in ((-1, 1000), (2**64, 1000), (2**64 + 3, 1000), (0, -1), (0, 2**64)):
+                with self.assertRaises(OverflowError, msg=(start, count)):
+                    search(b'1', b'x', start, 8, count)
+            with self.assertRaises(OverflowError):
+                search(b'1', b'x', -1, 8)
+            self.assertEqual(search(b'1', b'x', 0, 8, 2**64 - 1), first_proof(1, 'x', 0, 8, 1000))
+        self.each_backend(check)
+
+    def test_parallel_search(self):
+        target = 1 << (256 - 12)
+
+        def check(search):
+            with mock.patch.multiple(simple_blockchain, native_search=search, POW_WORKERS=3,
+                                     POW_CHUNK=64, DIFFICULTY_BITS=12, TARGET=target):
+                for last_proof in LAST_PROOFS[:4]:
+                    proof = simple_blockchain.Blockchain().proof_of_work(last_proof, 'ab' * 32)
+                    self.assertTrue(chain_check.valid_proof(last_proof, proof, 'ab' * 32, target))
+        self.each_backend(check)
+
+    def test_parallel_search_stops_when_a_worker_raises(self):
+        def search(prefix, suffix, start, bits, count):
+            if start == 0:
+                raise MemoryError
+            return None  # the other workers would search forever unless told to stop
+
+        with mock.patch.multiple(simple_blockchain, native_search=search, POW_WORKERS=2, POW_CHUNK=64):
+            with self.assertRaises(MemoryError):
+                simple_blockchain.Blockchain().proof_of_work(100, 'ab' * 32)
+
+
+@unittest.skipIf(simple_blockchain.sha256_many is None, 'pow_shani is not built')
+class Sha256ManyTest(unittest.TestCase):
+    def test_matches_hashlib(self):
+        for pairs in (0, 1, 2, 7, 64):
+            data = os.urandom(64 * pairs)
+            expected = b''.join(hashlib.sha256(data[i:i + 64]).digest() for i in range(0, len(data), 64))
+            self.assertEqual(simple_blockchain.sha256_many(data), expected)
+
+    def test_rejects_partial_pairs(self):
+        with self.assertRaises(ValueError):
+            simple_blockchain.sha256_many(bytes(63))
+
+    def test_merkle_root_matches_hashlib_fallback(self):
+        for count in (0, 1, 2, 3, 5, 8, 13):
+            tx_hashes = [os.urandom(32) for _ in range(count)]
+            self.assertEqual(chain_check.merkle_root(tx_hashes, simple_blockchain.sha256_many),
+                             chain_check.merkle_root(tx_hashes, None))
+
+
+if __name__ == '__main__':
+    unittest.main()